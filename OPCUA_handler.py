@@ -1,8 +1,47 @@
 from opcua import Client, ua
-import time
+from psycopg2 import sql
+import logging
 import threading
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from logger import PostgresLogger, PostgresConnection
+from logger import LoggerBackend, PostgresLogger
+
+ENDPOINTS = {
+    "xReady": 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stAppState.xReady',
+    "ONo" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.udiONo',
+    "PNo" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.udiPNo',
+    "OPos" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.uiOPos',
+    "OpNo" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.uiOpNo',
+    "ResourceId" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.uiResourceId'
+}
+
+# Order data read in one batch when a carrier passes a station
+MES_DATA_KEYS = ("ONo", "PNo", "OPos", "OpNo", "ResourceId")
+
+
+class StateChangeHandler:
+    """
+    Subscription handler for an OPC-UA module.
+    Forwards data change notifications to a queue consumed by OPCUAHandler.
+    """
+
+    def __init__(self, module, event_queue):
+        self.module = module
+        self.event_queue = event_queue
+
+    def datachange_notification(self, node, val, data):
+        # Called from the OPC-UA receive thread, so only hand the value over.
+        # The monotonic clock is used for cycle times, the wall clock is stored.
+        self.event_queue.put((self.module, val, datetime.now(), time.monotonic_ns()))
+
+    def status_change_notification(self, status):
+        # The subscription went bad (e.g. the server dropped the session), so
+        # xReady is unknown until the next value; treat the station as busy.
+        self.module.logger.log_info(f"Subscription status changed: {status}")
+        self.event_queue.put((self.module, None, datetime.now(), time.monotonic_ns()))
+
 
 class OPCUAFestoModule:
     """
@@ -10,38 +49,100 @@ class OPCUAFestoModule:
     Handles connection, disconnection, and data access via OPC-UA.
     """
 
-    def __init__(self, module_name: str, ip_address: str, port: int = 4840):
+    def __init__(self, module_name: str, ip_address: str, port: int = 4840, logger_factory=PostgresLogger):
         self.module_name = module_name
         self.ip_address = ip_address
         self.port = port
         self.client = None
+        self.subscription = None
+        self._node_cache = {}
+        self._registered_nodes = []
+        self._mes_nodes = []
         self.endpoint = f"opc.tcp://{self.ip_address}:{self.port}"
-        self.logger = PostgresLogger(self.module_name)
+        # Any callable taking the module name and returning a logger with
+        # log(), log_station_state(), log_info() and stop()
+        self.logger = logger_factory(self.module_name)
 
     def connect(self):
         try:
             self.client = Client(self.endpoint)
             self.client.connect()
+            for node_id in ENDPOINTS.values():
+                self._node_cache[node_id] = self.client.get_node(node_id)
+            self._register_nodes()
+            self._mes_nodes = [self._node_cache[ENDPOINTS[k]] for k in MES_DATA_KEYS]
             self.logger.log_info(f"Connected to {self.endpoint}")
         except Exception as e:
             self.logger.log_info(f"Failed to connect: {e}")
             self.client = None
 
+    def _register_nodes(self):
+        """
+        Register the cached nodes so the server can resolve them by a short handle
+        instead of parsing the full string NodeId on every read.
+        """
+        nodes = list(self._node_cache.values())
+        try:
+            # Rewrites the NodeIds of the cached Node objects in place
+            self._registered_nodes = self.client.register_nodes(nodes)
+        except Exception as e:
+            self.logger.log_info(f"Node registration not available: {e}")
+            self._registered_nodes = []
+
+    def subscribe(self, node_id: str, event_queue, period: int = 250):
+        """
+        Subscribe to data changes of a node. Notifications are pushed onto event_queue.
+        """
+        if not self.client:
+            self.logger.log_info(f"Not connected.")
+            return
+        try:
+            handler = StateChangeHandler(self, event_queue)
+            self.subscription = self.client.create_subscription(period, handler)
+            self.subscription.subscribe_data_change(self._get_node(node_id))
+            self.logger.log_info(f"Subscribed to {node_id}")
+        except ua.UaError as e:
+            self.logger.log_info(f"UA Error: {e}")
+            self.subscription = None
+        except Exception as e:
+            self.logger.log_info(f"Subscription Error: {e}")
+            self.subscription = None
+
     def disconnect(self):
         if self.client:
+            if self.subscription:
+                try:
+                    self.subscription.delete()
+                except Exception as e:
+                    self.logger.log_info(f"Error during unsubscribe: {e}")
+                self.subscription = None
+            if self._registered_nodes:
+                try:
+                    self.client.unregister_nodes(self._registered_nodes)
+                except Exception as e:
+                    self.logger.log_info(f"Error during unregister: {e}")
+                self._registered_nodes = []
             try:
                 self.client.disconnect()
                 self.logger.log_info(f"Disconnected from server")
             except Exception as e:
                 self.logger.log_info(f"Error during disconnect: {e}")
             self.client = None
+            self._node_cache = {}
+            self._mes_nodes = []
+
+    def _get_node(self, node_id: str):
+        node = self._node_cache.get(node_id)
+        if node is None:
+            node = self._node_cache[node_id] = self.client.get_node(node_id)
+        return node
 
     def get_value(self, node_id: str):
         if not self.client:
             self.logger.log_info(f"Not connected.")
             return None
         try:
-            node = self.client.get_node(node_id)
+            node = self._get_node(node_id)
             data_val = node.get_data_value()
             val = data_val.Value.Value
             return val
@@ -51,12 +152,27 @@ class OPCUAFestoModule:
             self.logger.log_info(f"Read Error: {e}")
         return None
 
+    def read_mes_data(self):
+        """
+        Read the order data (ONo, PNo, OPos, OpNo, ResourceId) in one Read request.
+        """
+        if not self.client:
+            self.logger.log_info(f"Not connected.")
+            return (None,) * len(MES_DATA_KEYS)
+        try:
+            return tuple(self.client.get_values(self._mes_nodes))
+        except ua.UaError as e:
+            self.logger.log_info(f"UA Error: {e}")
+        except Exception as e:
+            self.logger.log_info(f"Read Error: {e}")
+        return (None,) * len(MES_DATA_KEYS)
+
     def set_value(self, node_id: str, value, value_type=ua.VariantType.Boolean):
         if not self.client:
             self.logger.log_info(f"Not connected.")
             return
         try:
-            node = self.client.get_node(node_id)
+            node = self._get_node(node_id)
             node.set_value(ua.Variant(value, value_type))
             self.logger.log_info(f"Wrote {value} to {node_id}")
         except ua.UaError as e:
@@ -68,148 +184,215 @@ class OPCUAFestoModule:
 class OPCUAHandler:
     def __init__(self, module_list):
         self.modules = module_list
-        self.mes_logger = PostgresConnection()
         self.table_name = "system_info"
+        # Downtime updates are queued; the monitoring thread never waits on the database
+        self.mes_backend = LoggerBackend.shared()
+        self.mes_backend.acquire()
+        # Setup and MES messages use the pool of the shared backend
+        self.mes_logger = self.mes_backend.db
         self.threads = []
         self.stop_event = threading.Event()
 
-        self.module_states = {}
-        self.module_states_lock = threading.Lock()
+        # One queue for the xReady notifications of all modules
+        self.event_queue = queue.Queue()
+        self.stations = {}
+
+        # MES reads run on one thread per module, so a slow server only
+        # delays its own cycles and never the shared event queue
+        self.mes_readers = {}
+
+        # Modules whose carrier is present or whose state is still unknown
+        self.busy_modules = set()
+        self.last_all_idle = None
 
         self.system_downtime_start = None
+        self.system_downtime_start_mono_ns = None
 
         self.mes_logger.ensure_database()
 
-        self.mes_logger.execute(f"DROP TABLE IF EXISTS {self.table_name};")
-
-        self.mes_logger.execute(f"""
-        CREATE TABLE {self.table_name} (
+        # Keep the accumulated downtime across restarts; one statement batch, one round-trip
+        self.mes_logger.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {table} (
             system_start TIMESTAMPTZ NOT NULL,
-            total_downtime BIGINT NOT NULL
+            total_downtime BIGINT NOT NULL DEFAULT 0
         );
-        """)
-
-        self.mes_logger.execute(f"""
-        INSERT INTO {self.table_name} (system_start, total_downtime)
-        VALUES (NOW(), 0);
-        """)
-
+        INSERT INTO {table} (system_start, total_downtime)
+        SELECT NOW(), 0
+        WHERE NOT EXISTS (SELECT 1 FROM {table});
+        """).format(table=sql.Identifier(self.table_name)))
 
         for module in self.modules:
             module.connect()
 
-        self.endpoints = {
-            "xReady": 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stAppState.xReady',
-            "ONo" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.udiONo',
-            "PNo" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.udiPNo',
-            "OPos" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.uiOPos',
-            "OpNo" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.uiOpNo',
-            "ResourceId" : 'ns=2;s=|var|CECC-LK.Application.FBs.stpStopper1.stRfidData.stMesData.uiResourceId'
-        }
-    
-    def monitor_mes(self):
-        last_all_idle = None
+        self.endpoints = ENDPOINTS
 
+        # xReady changes are pushed by the servers instead of being polled
+        for module in self.modules:
+            self.stations[module.module_name] = {
+                "initialized": False,
+                "last_state": None,
+                "enter_timestamp": None,
+                "enter_mono_ns": None,
+                "order_data": None,
+            }
+            self.mes_readers[module.module_name] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"MES {module.module_name}")
+            # Unknown until the subscription delivers the initial value
+            self.busy_modules.add(module.module_name)
+            module.subscribe(self.endpoints["xReady"], self.event_queue)
+
+        # Connected servers that refused the subscription are polled instead
+        self.polled_modules = [m for m in self.modules if m.client and m.subscription is None]
+    
+    def update_module_state(self, module, state, timestamp, mono_ns):
+        """
+        Track which modules are busy and detect when the whole system enters or leaves downtime.
+        Runs only when a module state changes, on the monitoring thread, with the
+        time of the notification that changed it.
+        """
+        if state is True:
+            self.busy_modules.discard(module.module_name)
+        else:
+            self.busy_modules.add(module.module_name)
+
+        all_idle = not self.busy_modules
+
+        # ---------- ENTER DOWNTIME ----------
+        if all_idle and not self.last_all_idle:
+            self.system_downtime_start = timestamp
+            self.system_downtime_start_mono_ns = mono_ns
+            self.mes_logger.log_info("MES","System entered downtime")
+
+        # ---------- EXIT DOWNTIME ----------
+        elif not all_idle and self.last_all_idle:
+            if self.system_downtime_start:
+                delta = (mono_ns - self.system_downtime_start_mono_ns) // 1_000_000
+                self.system_downtime_start = None
+                self.system_downtime_start_mono_ns = None
+                self.mes_logger.log_info("MES",f"System downtime ended ({delta:.2f}ms)")
+                self.mes_backend.enqueue("downtime", self.table_name, delta)
+
+        self.last_all_idle = all_idle
+
+    def monitor_modules(self):
+        """
+        Consume the xReady notifications of all modules from one queue.
+        """
         while not self.stop_event.is_set():
-            with self.module_states_lock:
-                states = list(self.module_states.values())
-
-            if not states:
-                time.sleep(0.5)
+            try:
+                module, current_state, timestamp, mono_ns = self.event_queue.get(timeout=0.5)
+            except queue.Empty:
                 continue
 
-            all_idle = all(state is True for state in states)
-
-            # ---------- ENTER DOWNTIME ----------
-            if all_idle and not last_all_idle:
-                self.system_downtime_start = datetime.now()
-                self.mes_logger.log_info("MES","System entered downtime")
-
-            # ---------- EXIT DOWNTIME ----------
-            elif not all_idle and last_all_idle:
-                if self.system_downtime_start:
-                    delta = int((
-                        datetime.now() - self.system_downtime_start
-                    ).total_seconds() * 1000)
-                    self.system_downtime_start = None
-                    self.mes_logger.log_info("MES",f"System downtime ended ({delta:.2f}ms)")
-                    self.mes_logger.execute("""
-                            UPDATE system_info
-                            SET total_downtime = total_downtime + %s;
-                        """, (delta,))
-
-            last_all_idle = all_idle
-            time.sleep(0.5)
+            try:
+                self.handle_state_change(module, current_state, timestamp, mono_ns)
+            except Exception:
+                logging.getLogger("System").exception(
+                    f"State change of {module.module_name} could not be handled")
 
-    
-    def monitor_module(self, module):
-        last_state = module.get_value(self.endpoints["xReady"])
-        module.logger.log_station_state(last_state)
-        with self.module_states_lock:
-                self.module_states[module.module_name] = last_state
-
-        enter_timestamp = None
-        
-        while not self.stop_event.is_set():
-            current_state = module.get_value(self.endpoints["xReady"])
-
-            # --- ENTER station (True → False) ---
-            if last_state and not current_state:
-                module.logger.log_station_state(current_state)
-                with self.module_states_lock:
-                    self.module_states[module.module_name] = current_state
-                enter_timestamp = datetime.now()
-                if module.module_name == "End Module":
-                    order = module.get_value(self.endpoints["ONo"])
-                    part = module.get_value(self.endpoints["PNo"])
-                    pos = module.get_value(self.endpoints["OPos"])
-                    op = module.get_value(self.endpoints["OpNo"])
-                    res = module.get_value(self.endpoints["ResourceId"])
-
-            # --- EXIT station (False → True) ---
-            elif not last_state and current_state:
-                module.logger.log_station_state(current_state)
-                with self.module_states_lock:
-                    self.module_states[module.module_name] = current_state
-                exit_timestamp = datetime.now()
-                time.sleep(0.5)
-
-                # Read order data ONLY when exiting
-                if module.module_name != "End Module":
-                    order = module.get_value(self.endpoints["ONo"])
-                    part = module.get_value(self.endpoints["PNo"])
-                    pos = module.get_value(self.endpoints["OPos"])
-                    op = module.get_value(self.endpoints["OpNo"])
-                    res = module.get_value(self.endpoints["ResourceId"])
-
-                # Calculate cycle time and log information
-                cycle_time = int((exit_timestamp - enter_timestamp).total_seconds() * 1000)
-                module.logger.log(enter_timestamp, exit_timestamp, cycle_time, order, part, pos, op, res)
-
-                # Reset for the next carrier
-                enter_timestamp = None
-
-            last_state = current_state
-            time.sleep(0.5)
+    def handle_state_change(self, module, current_state, timestamp, mono_ns):
+        """
+        Run the enter/exit state machine of a module for one xReady notification.
+        """
+        station = self.stations[module.module_name]
+        last_state = station["last_state"]
+
+        # --- INITIAL value reported by the subscription ---
+        if not station["initialized"]:
+            module.logger.log_station_state(current_state)
+            self.update_module_state(module, current_state, timestamp, mono_ns)
+            station["last_state"] = current_state
+            station["initialized"] = True
+            return
 
+        # --- ENTER station (True → False) ---
+        if last_state and not current_state:
+            module.logger.log_station_state(current_state)
+            self.update_module_state(module, current_state, timestamp, mono_ns)
+            station["enter_timestamp"] = timestamp
+            station["enter_mono_ns"] = mono_ns
+            if module.module_name == "End Module":
+                station["order_data"] = self.mes_readers[module.module_name].submit(module.read_mes_data)
+
+        # --- EXIT station (False → True) ---
+        elif not last_state and current_state:
+            module.logger.log_station_state(current_state)
+            self.update_module_state(module, current_state, timestamp, mono_ns)
+            enter_timestamp = station["enter_timestamp"]
+            exit_timestamp = timestamp
+
+            # Carrier was already in the station when monitoring started
+            if enter_timestamp is not None:
+                # Calculate cycle time (immune to wall clock jumps)
+                cycle_time = (mono_ns - station["enter_mono_ns"]) // 1_000_000
+                self.mes_readers[module.module_name].submit(
+                    self.log_cycle, module, enter_timestamp, exit_timestamp,
+                    cycle_time, station["order_data"])
+
+            # Reset for the next carrier
+            station["enter_timestamp"] = None
+            station["enter_mono_ns"] = None
+            station["order_data"] = None
+
+        station["last_state"] = current_state
+
+    def log_cycle(self, module, enter_timestamp, exit_timestamp, cycle_time, order_read=None):
+        """
+        Read the order data and log one cycle. Runs on the MES reader of the module;
+        order_read is the read the End Module started when the carrier entered.
+        """
+        try:
+            # Read order data ONLY when exiting, except for the End Module
+            if order_read is None:
+                order_data = module.read_mes_data()
+            else:
+                order_data = order_read.result()
+            order, part, pos, op, res = order_data
+            module.logger.log(enter_timestamp, exit_timestamp, cycle_time, order, part, pos, op, res)
+        except Exception:
+            logging.getLogger("System").exception(f"Cycle of {module.module_name} could not be logged")
+
+    def poll_modules(self, interval=0.5):
+        """
+        Fallback for modules without a subscription: read xReady of all of them
+        concurrently every interval and feed changes into the event queue.
+        One tick takes as long as the slowest server, not the sum of all reads.
+        """
+        modules = self.polled_modules
+        last_values = {}
+
+        def read_ready(module):
+            return module.get_value(self.endpoints["xReady"])
 
+        with ThreadPoolExecutor(max_workers=len(modules)) as executor:
+            while not self.stop_event.is_set():
+                values = list(executor.map(read_ready, modules))
+                timestamp = datetime.now()
+                mono_ns = time.monotonic_ns()
+
+                # Only changes are forwarded, like a subscription would
+                for module, value in zip(modules, values):
+                    if module.module_name not in last_values or last_values[module.module_name] != value:
+                        last_values[module.module_name] = value
+                        self.event_queue.put((module, value, timestamp, mono_ns))
+
+                if self.stop_event.wait(interval):
+                    break
 
     def start_monitoring(self):
         """
-        Start a thread for each module to monitor state changes, and start MES monitoring.
+        Start one thread to monitor state changes of all modules and system downtime.
         """
+        t = threading.Thread(target=self.monitor_modules, daemon=True)
+        t.start()
+        self.threads.append(t)
+
+        if self.polled_modules:
+            poller = threading.Thread(target=self.poll_modules, daemon=True)
+            poller.start()
+            self.threads.append(poller)
         for module in self.modules:
-            t = threading.Thread(target=self.monitor_module, args=(module,), daemon=True)
-            t.start()
-            self.threads.append(t)
-            module.logger.log_info(f"Monitoring thread started.")
-
-        mes_thread = threading.Thread(
-        target=self.monitor_mes,
-        daemon=True
-        )
-        mes_thread.start()
-        self.threads.append(mes_thread)
+            module.logger.log_info(f"Monitoring started.")
             
 
 
@@ -217,8 +400,19 @@ class OPCUAHandler:
         """
         Signal all threads to stop and disconnect all modules.
         """
-        print("\n[System] Stopping all threads and disconnecting modules...")
+        log = logging.getLogger("System")
+        log.info("Stopping all threads and disconnecting modules...")
         self.stop_event.set()
+        for t in self.threads:
+            t.join(timeout=1)
+        # Finish the pending reads while the servers are still connected
+        for reader in self.mes_readers.values():
+            reader.shutdown(wait=True)
         for module in self.modules:
             module.disconnect()
-        print("[System] All modules disconnected.")
\ No newline at end of file
+        log.info("All modules disconnected.")
+
+        # Flush what the monitoring thread logged last
+        for module in self.modules:
+            module.logger.stop()
+        self.mes_backend.release()
\ No newline at end of file
@@ -1,7 +1,13 @@
 import psycopg2
+from psycopg2 import sql
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from datetime import datetime
 
+# PostgreSQL type OIDs of timestamp and timestamptz
+TIMESTAMP_OIDS = (1114, 1184)
+TIMESTAMP_FORMAT = "yyyy-mm-dd hh:mm:ss.000"
+
 
 def export_logs(
     user="postgres",
@@ -67,6 +73,8 @@ def export_single_database_to_excel(
     """
     Export one DB: each table → one sheet.
     Automatically strips timezone (tzinfo) from datetime values.
+    Rows are streamed from a server-side cursor into a write-only workbook,
+    so memory use does not grow with the size of the tables.
     """
 
     print(f"\n[INFO] Exporting database '{db_name}'...")
@@ -91,39 +99,62 @@ def export_single_database_to_excel(
 
     if not tables:
         print(f"[WARNING] No tables found in '{db_name}'. Skipping.")
+        cur.close()
+        conn.close()
         return
 
     # Create Excel workbook
-    wb = Workbook()
-    wb.remove(wb.active)
+    wb = Workbook(write_only=True)
 
     for table in tables:
         print(f"[INFO]   Exporting table '{table}'")
 
         ws = wb.create_sheet(title=table[:31])  # Excel sheet name limit
 
-        cur.execute(f"SELECT * FROM {table};")
-        rows = cur.fetchall()
+        # Named cursors only expose a description after the first fetch
+        cur.execute(sql.SQL("SELECT * FROM {} LIMIT 0;").format(sql.Identifier(table)))
         columns = [desc[0] for desc in cur.description]
 
-        ws.append(columns)
-
-    for row in rows:
-        cleaned_row = []
+        # Column types are known up front, so only timestamp columns are touched per row
+        ts_cols = [i for i, desc in enumerate(cur.description) if desc.type_code in TIMESTAMP_OIDS]
 
-        for value in row:
-            # Remove timezone information
-            if hasattr(value, "tzinfo") and value.tzinfo is not None:
-                value = value.replace(tzinfo=None)
-            cleaned_row.append(value)
-
-        ws.append(cleaned_row)
+        ws.append(columns)
 
-        # Apply millisecond format to datetime cells
-        row_idx = ws.max_row
-        for col_idx, value in enumerate(cleaned_row, start=1):
-            if isinstance(value, datetime):
-                ws.cell(row=row_idx, column=col_idx).number_format = "yyyy-mm-dd hh:mm:ss.000"
+        # Server-side cursor: rows are fetched in chunks of itersize
+        stream = conn.cursor(name="export_cur")
+        stream.itersize = 10000
+        stream.execute(sql.SQL("SELECT * FROM {};").format(sql.Identifier(table)))
+
+        # Bind to locals once; the loops below run for every row of the table
+        append = ws.append
+        make_cell = WriteOnlyCell
+        ts_format = TIMESTAMP_FORMAT
+
+        if not ts_cols:
+            # Nothing to convert, rows go to the sheet as they are
+            for row in stream:
+                append(row)
+        else:
+            for row in stream:
+                cleaned_row = list(row)
+
+                for i in ts_cols:
+                    value = cleaned_row[i]
+                    if value is None:
+                        continue
+
+                    # Remove timezone information
+                    if value.tzinfo is not None:
+                        value = value.replace(tzinfo=None)
+
+                    # Apply millisecond format to datetime cells
+                    cell = make_cell(ws, value=value)
+                    cell.number_format = ts_format
+                    cleaned_row[i] = cell
+
+                append(cleaned_row)
+
+        stream.close()
 
     # Save file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
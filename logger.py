@@ -1,13 +1,77 @@
+import collections
+import csv
+import functools
+import io
+import os
+import random
+import re
 import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-from datetime import datetime
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from contextlib import contextmanager
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import sys
+from types import MappingProxyType
 import threading
 import queue
 import time
 
+
+def setup_logging(log_file=None, level=logging.INFO):
+    """
+    Route all log records through a queue. Formatting and console/file I/O happen
+    on the listener thread, so monitor and worker threads never block on output.
+    Per-event cycle/state messages are logged at DEBUG; pass level=logging.DEBUG to see them.
+    Timestamps come from each record's creation time and are formatted by the listener.
+    Returns the started QueueListener; call stop() on shutdown to flush it.
+    """
+    log_queue = queue.Queue(-1)
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] [%(name)s] %(message)s")
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+
+    # python-opcua is chatty at INFO level
+    logging.getLogger("opcua").setLevel(logging.WARNING)
+
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    return listener
+
+
+# key=value, one per line; surrounding whitespace (and a CRLF's \r) is ignored
+CREDENTIAL_LINE = re.compile(r"(?m)^\s*(\w+)=(.*?)\s*$")
+
+
+@functools.lru_cache(maxsize=None)
+def _load_creds(path):
+    """
+    Parse a key=value credentials file. Cached per resolved path, since every
+    module's logger opens its own PostgresConnection with the same file.
+    """
+    with open(path, "r") as f:
+        creds = dict(CREDENTIAL_LINE.findall(f.read()))
+    # Read-only, as the cached mapping is shared between connections
+    return MappingProxyType(creds)
+
+
+# TCP keepalives so a dead database connection is noticed within about a minute
+# (30 s idle + 3 probes 10 s apart) instead of after the OS default of hours
+KEEPALIVES = dict(keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+
+
 class PostgresConnection:
-    def __init__(self, credentials_path="database_credentials_local.txt"):
-        self.credentials = self._read_credentials(credentials_path)
+    def __init__(self, credentials_path="database_credentials_local.txt", minconn=2, maxconn=8):
+        self.credentials = _load_creds(os.path.realpath(credentials_path))
 
         self.host = self.credentials["host"]
         self.db_name = self.credentials["database"]
@@ -15,105 +79,535 @@ class PostgresConnection:
         self.password = self.credentials.get("password")
         self.port = int(self.credentials.get("port", 5433))
 
-    # -------------------------------------------------
-    # CREDENTIALS
-    # -------------------------------------------------
-    def _read_credentials(self, path):
-        creds = {}
-        with open(path, "r") as f:
-            for line in f:
-                if "=" in line:
-                    key, value = line.strip().split("=", 1)
-                    creds[key] = value
-        return creds
+        # Persistent connections shared by setup, execute() and the logger workers
+        self.pool = self._create_pool(minconn, maxconn)
 
     # -------------------------------------------------
     # CONNECTION HANDLING
     # -------------------------------------------------
-    def connect(self):
+    def _create_pool(self, minconn, maxconn):
         try:
-            return psycopg2.connect(
+            return ThreadedConnectionPool(
+                minconn,
+                maxconn,
                 dbname=self.db_name,
                 user=self.user,
                 password=self.password,
                 host=self.host,
-                port=self.port
+                port=self.port,
+                **KEEPALIVES
             )
         except Exception:
             # fallback for peer auth
-            return psycopg2.connect(
+            return ThreadedConnectionPool(
+                minconn,
+                maxconn,
                 dbname=self.db_name,
                 user=self.user,
                 host=self.host,
-                port=self.port
+                port=self.port,
+                **KEEPALIVES
             )
 
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; uncommitted work is rolled back on return."""
+        conn = self.pool.getconn()
+        try:
+            yield conn
+        finally:
+            self.pool.putconn(conn)
+
     def execute(self, query, params=None, commit=True):
-        conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(query, params)
-        if commit:
-            conn.commit()
-        cur.close()
-        conn.close()
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            if commit:
+                conn.commit()
+            cur.close()
 
     def log_info(self, module_name, msg):
-        print(f"[INFO] [{module_name}] {msg}")
+        logging.getLogger(module_name).info(msg)
 
     # -------------------------------------------------
     # DATABASE / TABLE SETUP
     # -------------------------------------------------
     def ensure_database(self):
-        conn = self.connect()
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        cur = conn.cursor()
+        with self.connection() as conn:
+            # CREATE DATABASE cannot run inside a transaction
+            conn.autocommit = True
+            try:
+                cur = conn.cursor()
 
-        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (self.db_name,))
-        exists = cur.fetchone()
+                cur.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (self.db_name,))
+                exists = cur.fetchone()
 
-        if not exists:
-            cur.execute(f"CREATE DATABASE {self.db_name};")
-            print(f"[SETUP] Created database '{self.db_name}'")
-        else:
-            print(f"[SETUP] Database '{self.db_name}' exists")
+                if not exists:
+                    cur.execute(sql.SQL("CREATE DATABASE {};").format(sql.Identifier(self.db_name)))
+                    logging.getLogger("SETUP").info("Created database '%s'", self.db_name)
+                else:
+                    logging.getLogger("SETUP").info("Database '%s' exists", self.db_name)
 
-        cur.close()
-        conn.close()
+                cur.close()
+            finally:
+                conn.autocommit = False
 
     def drop_table(self, table_name):
-        self.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE;")
+        self.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE;").format(sql.Identifier(table_name)))
+
+
+# Column order of the cycle rows queued by PostgresLogger.log()
+LOG_COLUMNS = (
+    "enter_time, exit_time, cycle_time, "
+    "order_number, part_number, "
+    "order_position, operation_number, resource_id"
+)
+CYCLE_VALUES = "(%s,%s,%s,%s,%s,%s,%s,%s)"
+PREPARE_STATE_SQL = """
+    PREPARE log_state (text, text) AS
+    INSERT INTO station_states (station_name, state)
+    VALUES ($1, $2)
+    ON CONFLICT (station_name)
+    DO UPDATE SET state = EXCLUDED.state;
+"""
+EXECUTE_STATE_SQL = "EXECUTE log_state (%s, %s);"
+# Milliseconds of system downtime, added to the running total in system_info
+ADD_DOWNTIME_SQL = "UPDATE {} SET total_downtime = total_downtime + %s;"
+
+# Minimum seconds between "queue full" warnings while records are being dropped
+DROP_REPORT_INTERVAL = 10
+
+# Seconds the worker waits before reconnecting, doubled per failed attempt
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 30
+
+
+class CycleTableSQL:
+    """Statements for one module's cycle table, built once when the table is registered."""
+
+    def __init__(self, table_name):
+        table = sql.Identifier(table_name)
+        columns = sql.SQL(LOG_COLUMNS)
+        # Prepared statements are per session, so each table needs its own name
+        self.statement_name = "log_cycle_" + table_name
+        statement = sql.Identifier(self.statement_name)
+
+        self.insert = sql.SQL("INSERT INTO {} ({}) VALUES ").format(table, columns)
+        self.prepare = sql.SQL(
+            "PREPARE {} AS INSERT INTO {} ({}) "
+            "VALUES ($1,$2,$3,$4,$5,$6,$7,$8);"
+        ).format(statement, table, columns)
+        self.execute = sql.SQL("EXECUTE {} " + CYCLE_VALUES + ";").format(statement)
+        self.copy = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv);").format(table, columns)
+
+
+class LoggerBackend:
+    """
+    Writes the cycle records and station states of all modules to PostgreSQL
+    through one connection pool and one worker thread. Modules log through their
+    own PostgresLogger, which queues records here. The worker drains the shared
+    queue in transactions of up to commit_every records, so the commit (WAL
+    flush) cost is shared by the whole group, across modules, instead of paid
+    per record. Batches of at least copy_threshold cycle records for a table,
+    e.g. a backlog after a database outage, are loaded with COPY instead of INSERT.
+
+    With synchronous_commit="off" (the default) the worker's commits do not wait
+    for the WAL flush. A server crash can lose the last few hundred milliseconds
+    of records, but never corrupts the tables; pass "on" for full durability.
+    """
+
+    # Backends created by shared(), keyed by resolved credentials path
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, credentials_path="database_credentials_local.txt", commit_every=5000, copy_threshold=1000, max_wait_ms=50, max_queue=10000, synchronous_commit="off"):
+        self._log = logging.getLogger("Logger")
+        self.db = PostgresConnection(credentials_path)
+        self.commit_every = commit_every
+        self.copy_threshold = copy_threshold
+        self.synchronous_commit = synchronous_commit
+        self.max_wait = max_wait_ms / 1000
+
+        # Cycle table name -> CycleTableSQL, filled by register()
+        self._tables = {}
+        self._users = 0
+
+        # Worker-only state of its current connection, reset by _connect()
+        self._prepared = set()
+        self._insert_prefixes = {}
+
+        # Items are ("cycle", table, row), ("state", None, (station, state))
+        # or ("downtime", table, milliseconds).
+        # Bounded so a stalled database cannot grow memory without limit.
+        self.max_queue = max_queue
+        self._buf = collections.deque()
+        self._cv = threading.Condition()
+        self.dropped = 0  # records lost to a full buffer since start
+        self._reported_drops = 0
+        self._last_drop_report = None
+
+        # Worker
+        self.stop_event = threading.Event()
+        self.worker = threading.Thread(target=self._worker, daemon=True)
+        self.worker.start()
+
+    @classmethod
+    def shared(cls, credentials_path="database_credentials_local.txt"):
+        """Return the running backend for a credentials file, creating it on first use."""
+        key = os.path.realpath(credentials_path)
+        with cls._shared_lock:
+            backend = cls._shared.get(key)
+            if backend is None or backend.stop_event.is_set():
+                backend = cls._shared[key] = cls(credentials_path)
+            return backend
+
+    # -------------------------------------------------
+    # REGISTRATION
+    # -------------------------------------------------
+    def register(self, table_name):
+        """Add a cycle table for the worker to write to. Call before queuing its records."""
+        with self._cv:
+            if table_name not in self._tables:
+                self._tables[table_name] = CycleTableSQL(table_name)
+        self.acquire()
+
+    def acquire(self):
+        """Count a user of the backend; the worker runs until every user has called release()."""
+        with self._cv:
+            self._users += 1
+
+    def release(self, timeout=2):
+        """
+        Drop one user of the backend. The worker is stopped, after flushing the
+        queue, only when its last user is stopped.
+        """
+        with self._cv:
+            self._users -= 1
+            last = self._users <= 0
+        if last:
+            self.stop(timeout)
+
+    # -------------------------------------------------
+    # QUEUE
+    # -------------------------------------------------
+    def enqueue(self, kind, table_name, data):
+        # Never block the monitoring thread on a full buffer
+        with self._cv:
+            full = len(self._buf) >= self.max_queue
+            if not full:
+                self._buf.append((kind, table_name, data))
+                # The worker only waits while the buffer is empty, so only
+                # the first record after a drain needs to wake it
+                if len(self._buf) == 1:
+                    self._cv.notify()
+        if full:
+            self._record_drop(kind)
+        elif self._last_drop_report is not None:
+            self._log.warning("Queue accepting records again, %d dropped in total", self.dropped)
+            self._reported_drops = self.dropped
+            self._last_drop_report = None
+
+    def _record_drop(self, kind):
+        # A stalled database overflows the buffer on every record, so the
+        # warning is rate limited instead of logged per dropped record
+        self.dropped += 1
+        now = time.monotonic()
+        if self._last_drop_report is None or now - self._last_drop_report >= DROP_REPORT_INTERVAL:
+            self._log.warning(
+                "Queue full (%d records), dropped %d record(s) (last: %s), %d in total",
+                self.max_queue, self.dropped - self._reported_drops, kind, self.dropped,
+            )
+            self._reported_drops = self.dropped
+            self._last_drop_report = now
+
+    def _drain(self, max_items, timeout):
+        """
+        Wait up to timeout seconds for queued items, then take up to max_items of
+        them under a single lock acquisition. Returns early when stop() is called.
+        """
+        with self._cv:
+            self._cv.wait_for(lambda: self._buf or self.stop_event.is_set(), timeout)
+            count = min(max_items, len(self._buf))
+            return [self._buf.popleft() for _ in range(count)]
+
+    # -------------------------------------------------
+    # WORKERS
+    # -------------------------------------------------
+    def _worker(self):
+        conn = None
+        cur = None
+        retry = []
+        delay = RECONNECT_MIN_DELAY
+
+        while True:
+            # A batch that failed on a lost connection is written first, keeping the order
+            items = retry
+            retry = []
+            if conn is None:
+                try:
+                    conn, cur = self._connect()
+                except Exception as e:
+                    self._log.error("Logger connection error, retrying %d records: %s", len(items), e)
+                    retry = items
+                    if not self._wait_to_retry(delay):
+                        break
+                    delay = min(RECONNECT_MAX_DELAY, delay * 2)
+                    continue
+            try:
+                # Block for the first items, then collect more until the transaction
+                # is full or max_wait has passed
+                if not items:
+                    items = self._drain(self.commit_every, 0.5)
+                    if not items:
+                        if self.stop_event.is_set():
+                            break
+                        continue
+                deadline = time.monotonic() + self.max_wait
+                while len(items) < self.commit_every:
+                    remaining = max(deadline - time.monotonic(), 0)
+                    more = self._drain(self.commit_every - len(items), remaining)
+                    if not more:
+                        break
+                    items.extend(more)
+
+                # Cycle rows grouped by table, in queue order within each table.
+                # Only the latest state per station matters, older ones are skipped.
+                # Downtime is summed per table into one UPDATE.
+                rows_by_table = {}
+                latest_states = {}
+                downtime = {}
+                for kind, table_name, data in items:
+                    if kind == "cycle":
+                        rows_by_table.setdefault(table_name, []).append(data)
+                    elif kind == "state":
+                        station, state = data
+                        latest_states[station] = state
+                    else:
+                        downtime[table_name] = downtime.get(table_name, 0) + data
+
+                try:
+                    self._write(cur, rows_by_table, latest_states, downtime)
+                except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+                    # A bad record, e.g. a cycle whose MES read failed, must not
+                    # take the other modules' records down with it
+                    self._log.warning("Batch rejected, writing %d records one by one: %s", len(items), e)
+                    cur.execute("ROLLBACK;")
+                    self._write_each(cur, rows_by_table, latest_states, downtime)
+                delay = RECONNECT_MIN_DELAY
+
+                # Exit once everything queued before stop() has been written
+                if self.stop_event.is_set() and not self._buf:
+                    break
+
+            except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError) as e:
+                self._log.error("Logger connection error, retrying %d records: %s", len(items), e)
+                retry = items
+                conn = self._release(conn, close=True)
+                if not self._wait_to_retry(delay):
+                    break
+                delay = min(RECONNECT_MAX_DELAY, delay * 2)
+            except psycopg2.Error as e:
+                # The data itself was rejected; retrying would fail the same way
+                self._log.error("Logger error, dropped %d records: %s", len(items), e)
+                conn = self._rollback(conn, cur)
+            except Exception as e:
+                self._log.error("Logger error: %s", e)
+                conn = self._release(conn, close=True)
+                if not self._wait_to_retry(delay):
+                    break
+                delay = min(RECONNECT_MAX_DELAY, delay * 2)
+
+        self._release(conn)
+
+    def _write(self, cur, rows_by_table, latest_states, downtime):
+        """
+        Write one batch as a single transaction. Without COPY the batch is one
+        multi-statement query, which the server runs as one implicit transaction,
+        so it costs a single round-trip. COPY is a separate exchange, so then the
+        transaction is opened explicitly: copied rows commit, or roll back,
+        together with the rest of the batch and are never written twice on retry.
+        """
+        # Pipeline the whole batch: one round-trip instead of one per statement.
+        # This is what psycopg2.extras.execute_batch() does per page, but here
+        # cycle and state statements share a single page and transaction.
+        statements = []
+        copies = []
+        for table_name, rows in rows_by_table.items():
+            table = self._tables[table_name]
+            if len(rows) >= self.copy_threshold:
+                # Bulk path: COPY skips per-row INSERT parsing and planning
+                copies.append((table, rows))
+            elif len(rows) == 1:
+                # Common case: one carrier at a time, reuse the server-side plan
+                self._ensure_prepared(cur, table.statement_name, table.prepare)
+                statements.append(cur.mogrify(table.execute, rows[0]))
+            else:
+                prefix = self._insert_prefixes.get(table_name)
+                if prefix is None:
+                    prefix = self._insert_prefixes[table_name] = cur.mogrify(table.insert)
+                values = b",".join(cur.mogrify(CYCLE_VALUES, row) for row in rows)
+                statements.append(prefix + values + b";")
+
+        if latest_states:
+            self._ensure_prepared(cur, "log_state", PREPARE_STATE_SQL)
+        for station_state in latest_states.items():
+            statements.append(cur.mogrify(EXECUTE_STATE_SQL, station_state))
+        for table_name, milliseconds in downtime.items():
+            statements.append(self._add_downtime(cur, table_name, milliseconds))
+
+        if copies:
+            cur.execute("BEGIN;")
+            for table, rows in copies:
+                self._copy_rows(cur, table, rows)
+            statements.append(b"COMMIT;")
+        if statements:
+            cur.execute(b"".join(statements))
+
+    def _write_each(self, cur, rows_by_table, latest_states, downtime):
+        """
+        Fallback for a rejected batch: write it record by record, each under a
+        savepoint, so only the records the database rejects are dropped. It is
+        still one transaction, so a lost connection midway retries cleanly.
+        """
+        records = []
+        for table_name, rows in rows_by_table.items():
+            table = self._tables[table_name]
+            self._ensure_prepared(cur, table.statement_name, table.prepare)
+            records.extend(("cycle", cur.mogrify(table.execute, row)) for row in rows)
+        if latest_states:
+            self._ensure_prepared(cur, "log_state", PREPARE_STATE_SQL)
+            records.extend(("state", cur.mogrify(EXECUTE_STATE_SQL, s)) for s in latest_states.items())
+        records.extend(("downtime", self._add_downtime(cur, t, ms)) for t, ms in downtime.items())
+
+        cur.execute("BEGIN;")
+        for kind, statement in records:
+            try:
+                cur.execute(b"SAVEPOINT record;" + statement + b"RELEASE SAVEPOINT record;")
+            except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+                cur.execute("ROLLBACK TO SAVEPOINT record; RELEASE SAVEPOINT record;")
+                self._log.error("Logger error, dropped %s record %s: %s", kind, statement.decode(), e)
+        cur.execute("COMMIT;")
+
+    def _add_downtime(self, cur, table_name, milliseconds):
+        return cur.mogrify(sql.SQL(ADD_DOWNTIME_SQL).format(sql.Identifier(table_name)), (milliseconds,))
+
+    def _copy_rows(self, cur, table, rows):
+        """Load cycle rows with COPY FROM STDIN, serialized as CSV."""
+        buf = io.StringIO()
+        # None becomes an unquoted empty field, which COPY reads as NULL
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        cur.copy_expert(table.copy, buf)
+
+    def _connect(self):
+        """
+        Borrow a connection for the worker and set up its session. A connection
+        that fails during setup is closed rather than kept half initialized.
+        """
+        conn = self.db.pool.getconn()
+        try:
+            # _write() runs each batch as one transaction of its own
+            conn.autocommit = True
+            cur = conn.cursor()
+            # Session setting for the ingest connection only
+            cur.execute("SET synchronous_commit = %s;", (self.synchronous_commit,))
+            # A connection returned to the pool keeps its prepared statements,
+            # so they must not be prepared again
+            cur.execute("SELECT name FROM pg_prepared_statements;")
+            self._prepared = {row[0] for row in cur.fetchall()}
+        except Exception:
+            self._release(conn, close=True)
+            raise
+        # Rendered once per connection; rows are appended as bytes
+        self._insert_prefixes = {}
+        return conn, cur
+
+    def _ensure_prepared(self, cur, name, statement):
+        """
+        Prepare a statement the first time it is used on the worker's connection.
+        Lazy, so nothing is prepared against a table before a logger has created it.
+        """
+        if name not in self._prepared:
+            cur.execute(statement)
+            self._prepared.add(name)
+
+    def _wait_to_retry(self, delay):
+        """
+        Back off with jitter while the database is down. Returns False if stop()
+        was called meanwhile.
+        """
+        return not self.stop_event.wait(delay + random.random())
+
+    def _rollback(self, conn, cur):
+        """
+        End a batch that failed on the server. In autocommit only a batch with COPY
+        leaves a transaction open, but ROLLBACK is harmless otherwise. Returns the
+        connection, or None if it had to be closed.
+        """
+        try:
+            cur.execute("ROLLBACK;")
+            return conn
+        except psycopg2.Error as e:
+            self._log.error("Logger error: %s", e)
+            return self._release(conn, close=True)
+
+    def _release(self, conn, close=False):
+        """Return a borrowed connection to the pool; broken ones are closed."""
+        if conn is not None:
+            try:
+                if not close and not conn.closed:
+                    conn.cursor().execute("RESET synchronous_commit;")
+                    conn.autocommit = False
+                self.db.pool.putconn(conn, close=close)
+            except Exception as e:
+                self._log.error("Logger error: %s", e)
+        return None
+
+    # -------------------------------------------------
+    def stop(self, timeout=2):
+        """Stop the worker after it has flushed the queue, waiting at most timeout seconds."""
+        with self._cv:
+            self.stop_event.set()
+            # Wake the worker instead of waiting for its timeout
+            self._cv.notify_all()
+        self.worker.join(timeout)
 
 
 class PostgresLogger:
-    def __init__(self, module_name, credentials_path="database_credentials_local.txt",reset=True):
+    """
+    Per-module front end of the shared LoggerBackend. Creates the module's cycle
+    table and tags queued records with it; writing happens on the backend's worker.
+    """
+
+    def __init__(self, module_name, credentials_path="database_credentials_local.txt", reset=True, backend=None):
         self.module_name = module_name
+        self._log = logging.getLogger(module_name)
         self.table_name = module_name.lower().replace(" ", "_") + "_logs"
-        self.db = PostgresConnection(credentials_path)
+        self.backend = backend or LoggerBackend.shared(credentials_path)
+        self.db = self.backend.db
         self.reset = reset
 
-        self.cycle_queue = queue.Queue()
-        self.state_queue = queue.Queue()
-
         # Setup
-        if reset:
-            self.db.drop_table(self.table_name)
-
-        self._ensure_log_table()
-        self._ensure_states_table()
-
-        # Workers
-        self.stop_event = threading.Event()
-        threading.Thread(target=self._cycle_worker, daemon=True).start()
-        threading.Thread(target=self._state_worker, daemon=True).start()
+        self._setup_tables()
+        self.backend.register(self.table_name)
 
-        print(f"[{self.module_name}] Logger ready")
+        self._log.info("Logger ready")
 
     # -------------------------------------------------
     # TABLES
     # -------------------------------------------------
-    def _ensure_log_table(self):
-        self.db.execute(f"""
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
+    def _setup_tables(self):
+        """
+        Drop (if reset) and create this logger's tables. The DDL is sent in autocommit
+        as one multi-statement query, which the server still runs as a single
+        transaction, so there is one round-trip and no separate COMMIT.
+        """
+        table = sql.Identifier(self.table_name)
+        statements = []
+        if self.reset:
+            statements.append(sql.SQL("DROP TABLE IF EXISTS {} CASCADE;").format(table))
+        statements.append(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {} (
                 enter_time TIMESTAMPTZ NOT NULL,
                 exit_time TIMESTAMPTZ NOT NULL,
                 cycle_time BIGINT NOT NULL,
@@ -123,89 +617,42 @@ class PostgresLogger:
                 operation_number TEXT NOT NULL,
                 resource_id TEXT NOT NULL
             );
-        """)
-
-    def _ensure_states_table(self):
-        self.db.execute("""
-            CREATE TABLE IF NOT EXISTS station_states (
+        """).format(table))
+        # Only the latest state per station is kept, so skip the WAL
+        statements.append(sql.SQL("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS station_states (
                 station_name TEXT PRIMARY KEY,
                 state TEXT NOT NULL
             );
-        """)
+        """))
+
+        with self.db.connection() as conn:
+            conn.autocommit = True
+            try:
+                cur = conn.cursor()
+                cur.execute(sql.Composed(statements))
+                cur.close()
+            finally:
+                conn.autocommit = False
 
     # -------------------------------------------------
     # PUBLIC API
     # -------------------------------------------------
     def log(self, enter_time, exit_time, cycle_time, order, part, pos, op, res):
-        print(f"[LOG] [{self.module_name}] {datetime.now()}")
-        self.cycle_queue.put((enter_time, exit_time, cycle_time, order, part, pos, op, res))
+        # The record's own creation time is printed by the formatter, on the listener thread
+        self._log.debug("Cycle logged")
+        self.backend.enqueue("cycle", self.table_name, (enter_time, exit_time, cycle_time, order, part, pos, op, res))
 
     def log_station_state(self, state):
-        print(f"[STATE] [{self.module_name}] → {state}")
-        self.state_queue.put((self.module_name, state))
+        self._log.debug("State → %s", state)
+        # None means unknown (lost connection); the table keeps the last known state
+        if state is not None:
+            self.backend.enqueue("state", None, (self.module_name, state))
 
     def log_info(self, msg):
-        print(f"[INFO] [{self.module_name}] {msg}")
-
-    # -------------------------------------------------
-    # WORKERS
-    # -------------------------------------------------
-    def _cycle_worker(self):
-        conn = None
-        cur = None
-
-        while not self.stop_event.is_set():
-            try:
-                if conn is None:
-                    conn = self.db.connect()
-                    cur = conn.cursor()
-
-                data = self.cycle_queue.get(timeout=0.5)
-
-                cur.execute(f"""
-                    INSERT INTO {self.table_name} (
-                        enter_time, exit_time, cycle_time,
-                        order_number, part_number,
-                        order_position, operation_number, resource_id
-                    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s);
-                """, data)
-
-                conn.commit()
-
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"[LOGGER ERROR] {e}")
-                conn = None
-                time.sleep(1)
-
-    def _state_worker(self):
-        conn = None
-        cur = None
-
-        while not self.stop_event.is_set():
-            try:
-                if conn is None:
-                    conn = self.db.connect()
-                    cur = conn.cursor()
-
-                station, state = self.state_queue.get(timeout=0.5)
-
-                cur.execute("""
-                    INSERT INTO station_states (station_name, state)
-                    VALUES (%s, %s)
-                    ON CONFLICT (station_name)
-                    DO UPDATE SET state = EXCLUDED.state;
-                """, (station, state))
-
-                conn.commit()
-
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"[LOGGER STATE ERROR] {e}")
-                conn = None
+        self._log.info(msg)
 
     # -------------------------------------------------
-    def stop(self):
-        self.stop_event.set()
+    def stop(self, timeout=2):
+        """Detach from the backend; the last logger to stop flushes and stops its worker."""
+        self.backend.release(timeout)
@@ -1,5 +1,10 @@
+import logging
+from logger import setup_logging
 from OPCUA_handler import OPCUAFestoModule, OPCUAHandler
 
+# Configure logging before the modules below start logging
+log_listener = setup_logging()
+
 modules = [
     OPCUAFestoModule("Bottom Cover Module", '172.20.3.1'),
     OPCUAFestoModule("Error Module", '172.20.13.1'),
@@ -25,4 +30,5 @@ if __name__ == "__main__":
         pass
     finally:
         handler.stop_all()
-        print("[System] Shutdown complete.")
+        logging.getLogger("System").info("Shutdown complete.")
+        log_listener.stop()